@@ -0,0 +1 @@
+# Keeps the repository root on sys.path, so that the tests can import the scripts as modules.
@@ -0,0 +1,127 @@
+import os
+import threading
+import numpy as np
+import matplotlib.image
+import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+class FigureWriter:
+    """
+    Background writer of figures as PNG files.
+
+    The calling thread only rasterises the figure to an in-memory buffer, then a pool of threads compresses it
+    and writes it to disk, so the next figure can be drawn while the last one is encoded. At most max_pending
+    figures wait to be written: past that, save blocks until one is done.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 8, compress_level: int = 6):
+        """
+        Parameters
+        ----------
+        max_workers : int, optional
+            The number of encoding threads. The default is 2.
+        max_pending : int, optional
+            The maximum number of figures rasterised but not written yet. The default is 8.
+        compress_level : int, optional
+            The PNG compression level, from 0 (fastest, biggest files) to 9. The default is 6.
+        """
+        self.compress_level = compress_level
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._futures = []
+
+    def save(self, fig: plt.Figure, path: str) -> None:
+        """
+        Rasterise a figure and queue it to be written. The figure is closed.
+
+        Parameters
+        ----------
+        fig : plt.Figure
+            The figure.
+        path : str
+            The path of the PNG file.
+
+        Returns
+        -------
+        None
+        """
+        # Like savefig, add the extension when the path has none
+        if not os.path.splitext(path)[1]:
+            path += '.png'
+        canvas = FigureCanvasAgg(fig)
+        canvas.draw()
+        image = np.asarray(canvas.buffer_rgba()).copy()
+        plt.close(fig)
+        self._pending.acquire()
+        future = self._executor.submit(self._write, image, path)
+        future.add_done_callback(lambda _: self._pending.release())
+        self._futures.append(future)
+
+    def _write(self, image: np.ndarray, path: str) -> None:
+        # Write under a temporary name so that a file on disk is always complete
+        tmp = path + '.tmp'
+        matplotlib.image.imsave(tmp, image, format='png', pil_kwargs={'compress_level': self.compress_level})
+        os.replace(tmp, path)
+
+    def flush(self) -> None:
+        """
+        Wait until every queued figure is on disk, and raise the first error of a write if any.
+
+        Returns
+        -------
+        None
+        """
+        futures, self._futures = self._futures, []
+        errors = [future.exception() for future in futures]
+        errors = [error for error in errors if error is not None]
+        if errors:
+            raise errors[0]
+
+# The writer used by save_figure, if background writes are enabled
+figure_writer = None
+
+def enable_background_writes(max_workers: int = 2, max_pending: int = 8, compress_level: int = 6) -> FigureWriter:
+    """
+    Make save_figure write the figures in the background. See FigureWriter for the parameters.
+
+    Returns
+    -------
+    FigureWriter
+        The writer, to flush at the end.
+    """
+    global figure_writer
+    figure_writer = FigureWriter(max_workers, max_pending, compress_level)
+    return figure_writer
+
+def save_figure(fig: plt.Figure, path: str) -> None:
+    """
+    Save a figure as a PNG file and close it, in the background if enabled.
+
+    Parameters
+    ----------
+    fig : plt.Figure
+        The figure.
+    path : str
+        The path of the PNG file.
+
+    Returns
+    -------
+    None
+    """
+    if figure_writer is None:
+        fig.savefig(path)
+        plt.close(fig)
+    else:
+        figure_writer.save(fig, path)
+
+def flush_figures() -> None:
+    """
+    Wait until every figure saved in the background is on disk.
+
+    Returns
+    -------
+    None
+    """
+    if figure_writer is not None:
+        figure_writer.flush()
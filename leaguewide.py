@@ -5,6 +5,14 @@ import matplotlib.pyplot as plt
 import sklearn.linear_model
 import seaborn as sns
 import numpy as np
+import os
+import asyncio
+import re
+from single_flight import SingleFlight
+from figure_writer import save_figure
+
+# Pages in flight, so that concurrent callers of the same url only download it once
+page_flights = SingleFlight()
 
 def get_page(url: str) -> BeautifulSoup:
     """
@@ -20,8 +28,16 @@ def get_page(url: str) -> BeautifulSoup:
     BeautifulSoup
         The page of the url.
     """
-    page = requests.get(url)
-    return BeautifulSoup(page.content, 'html.parser')
+    def fetch():
+        page = requests.get(url)
+        return BeautifulSoup(page.content, 'html.parser')
+    return page_flights.do(url, fetch)
+
+async def get_page_async(url: str) -> BeautifulSoup:
+    """
+    Same as get_page, for asyncio callers (coalesced with the thread callers).
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, get_page, url)
 
 def get_data_from_html(page: BeautifulSoup) -> pd.DataFrame:
     """
@@ -49,13 +65,18 @@ def get_data_from_html(page: BeautifulSoup) -> pd.DataFrame:
 
     # Get data
     data = []
+    player_ids = []
     for row in rows:
         cols = row.find_all('td')
         cols = [element.text.strip() for element in cols]
         data.append(cols)
+        # The FanGraphs player id is in the link on the name of the player
+        link = row.find('a', href=re.compile('playerid='))
+        player_ids.append(re.search(r'playerid=([^&]+)', link['href']).group(1) if link is not None else None)
     
     # Create dataframe
     df = pd.DataFrame(data, columns=header_cols)
+    df.insert(0, 'playerid', player_ids)
     # Remove '#' column
     df = df.drop('#', axis=1)
     # Remove empty rows
@@ -96,8 +117,9 @@ def get_stats(season: str, stats: str, month: str = '0', league: str='all', min_
     
     page = get_page(url)
     table = get_data_from_html(page)
-    # Convert everything we can to numeric
-    table = table.apply(pd.to_numeric, errors='ignore')
+    # Convert everything we can to numeric, except the player id which is an identifier, not a stat
+    numeric_cols = table.columns.drop('playerid')
+    table[numeric_cols] = table[numeric_cols].apply(pd.to_numeric, errors='ignore')
     return table
 
 def correlation_columns(df: pd.DataFrame, col1: str, col2: str, idx: str = None, linreg: bool = False, quadrants: bool = False) -> None:
@@ -170,6 +192,131 @@ def correlation_matrix(df: pd.DataFrame) -> None:
     sns.heatmap(corr, xticklabels=corr.columns, yticklabels=corr.columns, annot=True, cmap=sns.diverging_palette(220, 20, as_cmap=True), vmin=-1, vmax=1, center=0, square=True, linewidths=.5, cbar_kws={"shrink": .5})
     plt.show()
 
+def get_stats_seasons(seasons: list, stats: str, **kwargs) -> pd.DataFrame:
+    """
+    Get the stats of several seasons, stacked in a single dataframe.
+
+    Parameters
+    ----------
+    seasons : list
+        The seasons as strings.
+    stats : str
+        The stats to get. Must be one of 'pit', 'bat' or 'fld'.
+    **kwargs
+        Any other argument accepted by get_stats (month, league, min_ip, team, max_players).
+
+    Returns
+    -------
+    pd.DataFrame
+        The stats of all the seasons, with a 'Season' column.
+    """
+    tables = []
+    for season in seasons:
+        table = get_stats(season, stats, **kwargs)
+        if 'Season' not in table.columns:
+            table.insert(0, 'Season', int(season))
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True)
+
+def correlation_table(df: pd.DataFrame, columns: list = None, exclude: list = ['Season', 'playerid']) -> pd.DataFrame:
+    """
+    Compute the correlation and the linear regression of every pair of numeric columns of a dataframe.
+    Everything is computed at once with a few matrix products, using pairwise complete observations.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe.
+    columns : list, optional
+        The columns to use. The default is None, which means every numeric column.
+    exclude : list, optional
+        The columns to ignore. The default is ['Season', 'playerid'].
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per pair (x, y), with the number of observations, the correlation r, R^2, and the slope
+        and intercept of the regression of y on x, sorted by decreasing R^2.
+    """
+    if columns is None:
+        columns = df.select_dtypes(include=['number']).columns
+    columns = [col for col in columns if col not in exclude]
+    values = df[columns].to_numpy(dtype=float)
+    valid = ~np.isnan(values)
+    mask = valid.astype(float)
+    # Center each column on its own mean for numerical stability, and zero the missing values
+    centered = np.where(valid, values - np.nanmean(values, axis=0), 0.0)
+    squared = centered ** 2
+
+    # Entry [i, j] only sums over the rows where both columns i and j are present
+    n = mask.T @ mask
+    sum_x = centered.T @ mask
+    sum_y = sum_x.T
+    sum_xx = squared.T @ mask
+    sum_yy = sum_xx.T
+    sum_xy = centered.T @ centered
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov = sum_xy - sum_x * sum_y / n
+        var_x = sum_xx - sum_x ** 2 / n
+        var_y = sum_yy - sum_y ** 2 / n
+        r = cov / np.sqrt(var_x * var_y)
+        slope = cov / var_x
+        # Undo the centering to get the intercept in the original units
+        means = np.nanmean(values, axis=0)
+        intercept = (sum_y - slope * sum_x) / n + means[np.newaxis, :] - slope * means[:, np.newaxis]
+
+    # Keep only the upper triangle: x is column i, y is column j, with i < j
+    i, j = np.triu_indices(len(columns), k=1)
+    table = pd.DataFrame({
+        'x': np.asarray(columns)[i],
+        'y': np.asarray(columns)[j],
+        'n': n[i, j].astype(int),
+        'r': r[i, j],
+        'r2': r[i, j] ** 2,
+        'slope': slope[i, j],
+        'intercept': intercept[i, j],
+    })
+    table = table.dropna(subset=['r2'])
+    return table.sort_values('r2', ascending=False, ignore_index=True)
+
+def correlation_report(df: pd.DataFrame, table: pd.DataFrame, outfolder: str, top_k: int = 10, idx: str = None) -> None:
+    """
+    Save a scatterplot with its regression line for each of the top pairs of a correlation table, without showing them.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe the table was computed from.
+    table : pd.DataFrame
+        The table returned by correlation_table.
+    outfolder : str
+        The name of the output folder.
+    top_k : int, optional
+        The number of pairs to plot. The default is 10.
+    idx : str, optional
+        The column used to annotate the points. The default is None.
+
+    Returns
+    -------
+    None
+    """
+    if not os.path.exists(outfolder):
+        os.makedirs(outfolder)
+    for rank, row in enumerate(table.head(top_k).itertuples(index=False)):
+        fig, ax = plt.subplots(figsize=(9.6, 7.2))
+        ax.scatter(df[row.x], df[row.y])
+        if idx is not None:
+            for txt, x, y in zip(df[idx], df[row.x], df[row.y]):
+                ax.annotate(txt, (x, y))
+        x = np.array([df[row.x].min(), df[row.x].max()])
+        ax.plot(x, row.slope * x + row.intercept, color='red')
+        ax.text(0.05, 0.9, f'R^2: {round(row.r2, 2)}', transform=ax.transAxes)
+        ax.set_xlabel(row.x)
+        ax.set_ylabel(row.y)
+        ax.set_title(f'{row.x} vs {row.y}')
+        save_figure(fig, os.path.join(outfolder, f"{rank + 1}_{row.x}_{row.y}.png".replace('/', '-')))
+
 def report_histogram(df: pd.DataFrame, cols: list) -> None:
     """
     Create a histogram for each column given for a dataframe, and show them all in one.
@@ -0,0 +1,178 @@
+import os
+import glob
+import pandas as pd
+from leaguewide import get_stats
+
+class LeaderboardPanel:
+    """
+    Persistent store of FanGraphs leaderboards, combining seasons, months and stats types.
+
+    Each (stats, season, month) page is written once as its own typed partition in the root folder,
+    so appending a new season never rewrites the older ones. When queried, the partitions of a stats type
+    are combined into a single frame indexed by (playerid, Season, Month) and sorted, so looking up players
+    is an index slice rather than a scan on the names.
+    """
+
+    def __init__(self, root: str = 'leaderboards'):
+        """
+        Parameters
+        ----------
+        root : str, optional
+            The folder of the store. The default is 'leaderboards'.
+        """
+        self.root = root
+        self._panels = {}
+
+    def _partition_path(self, stats: str, season: int, month: int) -> str:
+        return os.path.join(self.root, stats, f"season={season}_month={month}.pkl")
+
+    def append(self, table: pd.DataFrame, stats: str, season: str, month: str = '0') -> None:
+        """
+        Add a leaderboard page to the store, replacing the partition of the same season and month if any.
+
+        Parameters
+        ----------
+        table : pd.DataFrame
+            The table returned by get_stats.
+        stats : str
+            The stats of the table. Must be one of 'pit', 'bat' or 'fld'.
+        season : str
+            The season of the table.
+        month : str, optional
+            The month of the table. The default is '0', which means the whole season.
+
+        Returns
+        -------
+        None
+        """
+        table = to_typed_columns(table)
+        table['Season'] = int(season)
+        table['Month'] = int(month)
+        table = table.sort_values('playerid', ignore_index=True)
+        path = self._partition_path(stats, int(season), int(month))
+        if not os.path.exists(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        # Write to a temporary file first so a partition is never left half written
+        table.to_pickle(path + '.tmp')
+        os.replace(path + '.tmp', path)
+        self._panels.pop(stats, None)
+
+    def add_season(self, season: str, stats: str, months: list = ['0'], **kwargs) -> None:
+        """
+        Fetch and store the leaderboards of a season.
+
+        Parameters
+        ----------
+        season : str
+            The season as a string.
+        stats : str
+            The stats to get. Must be one of 'pit', 'bat' or 'fld'.
+        months : list, optional
+            The months to get. The default is ['0'], which means the whole season.
+        **kwargs
+            Any other argument accepted by get_stats (league, min_ip, team, max_players).
+
+        Returns
+        -------
+        None
+        """
+        for month in months:
+            self.append(get_stats(season, stats, month=month, **kwargs), stats, season, month)
+
+    def panel(self, stats: str) -> pd.DataFrame:
+        """
+        Get every stored page of a stats type in a single frame.
+
+        Parameters
+        ----------
+        stats : str
+            The stats type. Must be one of 'pit', 'bat' or 'fld'.
+
+        Returns
+        -------
+        pd.DataFrame
+            The combined pages, indexed by (playerid, Season, Month) and sorted.
+        """
+        if stats not in self._panels:
+            paths = sorted(glob.glob(os.path.join(self.root, stats, '*.pkl')))
+            if not paths:
+                raise ValueError(f'no {stats} leaderboard stored in {self.root}')
+            panel = pd.concat([pd.read_pickle(path) for path in paths], ignore_index=True)
+            self._panels[stats] = panel.set_index(['playerid', 'Season', 'Month']).sort_index()
+        return self._panels[stats]
+
+    def player_seasons(self, stats: str, player_ids: list, month: str = '0') -> pd.DataFrame:
+        """
+        Get every stored season of some players.
+
+        Parameters
+        ----------
+        stats : str
+            The stats type. Must be one of 'pit', 'bat' or 'fld'.
+        player_ids : list
+            The FanGraphs ids of the players.
+        month : str, optional
+            The month. The default is '0', which means the whole season.
+
+        Returns
+        -------
+        pd.DataFrame
+            One row per player and season, indexed by (playerid, Season).
+        """
+        panel = self.panel(stats)
+        stored = panel.index.unique('playerid')
+        player_ids = sorted(set(str(player_id) for player_id in player_ids).intersection(stored))
+        return panel.loc[player_ids].xs(int(month), level='Month')
+
+    def player_series(self, stats: str, player_id: str, column: str) -> pd.Series:
+        """
+        Get the month by month series of a column for one player.
+
+        Parameters
+        ----------
+        stats : str
+            The stats type. Must be one of 'pit', 'bat' or 'fld'.
+        player_id : str
+            The FanGraphs id of the player.
+        column : str
+            The column, e.g. 'FIP'.
+
+        Returns
+        -------
+        pd.Series
+            The values indexed by (Season, Month), without the whole season rows.
+        """
+        rows = self.panel(stats).loc[str(player_id)]
+        return rows.loc[rows.index.get_level_values('Month') != 0, column]
+
+def to_typed_columns(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convert the text columns of a leaderboard to numbers where possible, including the percentages.
+
+    Parameters
+    ----------
+    table : pd.DataFrame
+        The table returned by get_stats.
+
+    Returns
+    -------
+    pd.DataFrame
+        The table with numeric columns, and the player id as a string.
+    """
+    table = table.copy()
+    for col in table.columns:
+        if col == 'playerid' or table[col].dtype != object:
+            continue
+        values = table[col].str.strip()
+        if values.notna().any() and values.dropna().str.endswith('%').all():
+            table[col] = pd.to_numeric(values.str.rstrip('%').str.strip(), errors='coerce') / 100
+        else:
+            table[col] = pd.to_numeric(values, errors='ignore')
+    table['playerid'] = table['playerid'].astype(str)
+    return table
+
+if __name__ == '__main__':
+    panel = LeaderboardPanel()
+    for season in ['2021', '2022', '2023']:
+        panel.add_season(season, 'pit', months=['0', '4', '5', '6', '7', '8', '9'])
+    print(panel.player_seasons('pit', panel.panel('pit').index.get_level_values('playerid').unique()[:200]))
@@ -0,0 +1,151 @@
+import pybaseball
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+from statcast import create_report, get_statcast, pitch_type_colour
+
+# Same features as in the boxplot report of statcast.py
+release_features = ['release_speed', 'release_spin_rate', 'release_pos_x', 'release_pos_z', 'release_extension']
+location_features = ['plate_x', 'plate_z']
+
+class PitchIndex:
+    """
+    Spatial index over a season of statcast data, to find the pitches near a plate location or similar to a pitch.
+
+    A KD-tree is built the first time a combination of space and filters is queried, and kept for the next queries,
+    so only the first query pays for the selection of the pitches. Release features are divided by their standard
+    deviation over the season, so that every feature weighs the same in the distances.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        """
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The statcast data, e.g. a whole season.
+        """
+        self.data = data.reset_index(drop=True)
+        self.scale = self.data[release_features].astype(float).std().to_numpy(dtype=float)
+        self._trees = {}
+
+    def _tree(self, columns: list, pitch_type: str = None, p_throws: str = None, stand: str = None, balls: int = None, strikes: int = None) -> tuple:
+        key = (tuple(columns), pitch_type, p_throws, stand, balls, strikes)
+        if key not in self._trees:
+            mask = self.data[columns].notna().all(axis=1)
+            for col, value in [('pitch_type', pitch_type), ('p_throws', p_throws), ('stand', stand), ('balls', balls), ('strikes', strikes)]:
+                if value is not None:
+                    mask &= self.data[col] == value
+            # Nullable statcast columns (e.g. Int64, Float64) give pd.NA, which never matches a filter
+            positions = np.flatnonzero(mask.to_numpy(dtype=bool, na_value=False))
+            points = self.data.loc[positions, columns].to_numpy(dtype=float)
+            if columns == release_features:
+                points = points / self.scale
+            self._trees[key] = (cKDTree(points), positions)
+        return self._trees[key]
+
+    def within(self, plate_x: float, plate_z: float, radius: float, **filters) -> pd.DataFrame:
+        """
+        Get the pitches within a radius of a plate location.
+
+        Parameters
+        ----------
+        plate_x : float
+            The x position at the plate.
+        plate_z : float
+            The z position at the plate.
+        radius : float
+            The radius, in feet.
+        **filters
+            Optional pitch_type, p_throws, stand, balls and strikes the pitches must have.
+
+        Returns
+        -------
+        pd.DataFrame
+            The pitches, with a 'distance' column.
+        """
+        tree, positions = self._tree(location_features, **filters)
+        found = np.asarray(tree.query_ball_point([plate_x, plate_z], radius), dtype=int)
+        pitches = self.data.iloc[positions[found]].copy()
+        pitches['distance'] = np.hypot(pitches['plate_x'] - plate_x, pitches['plate_z'] - plate_z)
+        return pitches.sort_values('distance')
+
+    def nearest(self, pitch: pd.Series, k: int = 10, **filters) -> pd.DataFrame:
+        """
+        Get the pitches with the closest release features to a pitch.
+
+        Parameters
+        ----------
+        pitch : pd.Series
+            The pitch, with at least the release_features, e.g. a row of the data.
+        k : int, optional
+            The number of pitches. The default is 10.
+        **filters
+            Optional pitch_type, p_throws, stand, balls and strikes the pitches must have.
+
+        Returns
+        -------
+        pd.DataFrame
+            The pitches, closest first, with a 'distance' column in standard deviations.
+        """
+        tree, positions = self._tree(release_features, **filters)
+        k = min(k, len(positions))
+        if k == 0:
+            return self.data.iloc[[]].assign(distance=[])
+        point = np.asarray([pitch[col] for col in release_features], dtype=float) / self.scale
+        distances, found = tree.query(point, k=k)
+        pitches = self.data.iloc[positions[np.atleast_1d(found)]].copy()
+        pitches['distance'] = np.atleast_1d(distances)
+        return pitches
+
+def get_season_index(year: str) -> PitchIndex:
+    """
+    Build the index of a whole season, using the pybaseball cache so the season is only downloaded once.
+
+    Parameters
+    ----------
+    year : str
+        The season.
+
+    Returns
+    -------
+    PitchIndex
+        The index of the season.
+    """
+    pybaseball.cache.enable()
+    return PitchIndex(get_statcast(None, f'{year}-01-01', f'{year}-12-31'))
+
+def similar_pitches_report(pitches: pd.DataFrame, title_plot: str, outfolder: str, outfile: str) -> None:
+    """
+    Create a report of the plate location of the pitches returned by a query, coloured by pitch type.
+
+    Parameters
+    ----------
+    pitches : pd.DataFrame
+        The pitches returned by PitchIndex.within or PitchIndex.nearest.
+    title_plot : str
+        The title of the plot
+    outfolder : str
+        The name of the output folder
+    outfile : str
+        The name of the output file
+
+    Returns
+    -------
+    None
+    """
+    create_report(
+        pitches[['pitch_type', 'plate_x', 'plate_z']].copy(),
+        ['plate_x', 'plate_z'],
+        'pitch_type',
+        pitch_type_colour,
+        title_plot,
+        outfolder,
+        outfile,
+        strike_zone=True
+    )
+
+if __name__ == '__main__':
+    index = get_season_index('2023')
+    pitch = index.data.iloc[0]
+    similar = index.nearest(pitch, k=200, pitch_type=pitch['pitch_type'])
+    similar_pitches_report(similar, f"Pitches similar to {pitch['player_name']}'s {pitch['pitch_type']}", 'similar_pitches', 'similar.png')
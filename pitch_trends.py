@@ -0,0 +1,276 @@
+import pickle
+from collections import deque
+import numpy as np
+import pandas as pd
+from statcast import get_statcast
+
+# Same metrics as in the boxplot report of pitcher_report.py
+tracked_columns = ['release_speed', 'effective_speed', 'release_spin_rate']
+
+def aggregate_games(data: pd.DataFrame, columns: list = tracked_columns) -> pd.DataFrame:
+    """
+    Aggregate pitches into one row per pitcher, pitch type and game.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The statcast data.
+    columns : list, optional
+        The columns to aggregate. The default is tracked_columns.
+
+    Returns
+    -------
+    pd.DataFrame
+        The count, mean and sum of squared deviations (m2) of every column, indexed by (pitcher, pitch_type),
+        with the player_name, game_pk and game_date columns, in the order of the games.
+    """
+    data = data[data['pitch_type'].notna()]
+    # Nullable columns (e.g. Float64 with pd.NA) become plain floats with NaN
+    data = data.assign(game_date=pd.to_datetime(data['game_date']), **{col: data[col].astype(float) for col in columns})
+    grouped = data.groupby(['pitcher', 'pitch_type', 'game_pk'])
+    games = grouped[columns].agg(['count', 'mean', 'var'])
+    aggregated = pd.DataFrame(index=games.index)
+    aggregated['player_name'] = grouped['player_name'].first()
+    aggregated['game_date'] = grouped['game_date'].first()
+    for col in columns:
+        aggregated[f'{col}_n'] = games[(col, 'count')]
+        aggregated[f'{col}_mean'] = games[(col, 'mean')]
+        aggregated[f'{col}_m2'] = (games[(col, 'var')] * (games[(col, 'count')] - 1)).fillna(0)
+    return aggregated.reset_index('game_pk').sort_values(['game_date', 'game_pk'], kind='mergesort')
+
+class PitchTrendTracker:
+    """
+    Incremental tracker of the velocity and spin of every pitcher, for each pitch type.
+
+    For each (pitcher, pitch_type), the tracker keeps the running mean and variance of every column over all
+    the pitches seen so far (the baseline), and an exponentially weighted mean of the game means. Each update only
+    aggregates the new pitches, and compares every new game to the baseline before merging it, so a game is flagged
+    when its mean is significantly below the pitcher's own baseline. Only the last `window` games of every pitcher
+    and pitch type are kept, for the rolling means.
+    """
+
+    def __init__(self, columns: list = tracked_columns, halflife: float = 3, z_threshold: float = 3, min_pitches: int = 5, min_baseline: int = 50, window: int = 5):
+        """
+        Parameters
+        ----------
+        columns : list, optional
+            The columns to track. The default is tracked_columns.
+        halflife : float, optional
+            The half-life, in games, of the exponentially weighted mean. The default is 3.
+        z_threshold : float, optional
+            How many standard errors below the baseline a game mean must be to be flagged. The default is 3.
+        min_pitches : int, optional
+            The minimum number of pitches of a type in a game to test it. The default is 5.
+        min_baseline : int, optional
+            The minimum number of pitches of a type in the baseline to test a game. The default is 50.
+        window : int, optional
+            The number of games of the rolling means. The default is 5.
+        """
+        self.columns = columns
+        self.alpha = 1 - 0.5 ** (1 / halflife)
+        self.z_threshold = z_threshold
+        self.min_pitches = min_pitches
+        self.min_baseline = min_baseline
+        self.window = window
+        self.state = pd.DataFrame(
+            columns=['player_name', 'last_game'] + [f'{col}_{stat}' for col in columns for stat in ['n', 'mean', 'm2', 'ewm']],
+            index=pd.MultiIndex.from_arrays([[], []], names=['pitcher', 'pitch_type']))
+        # Counts and means of the last games of every (pitcher, pitch_type), and the games already merged
+        self.recent = {}
+        self.seen = set()
+
+    def update(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add new pitches to the tracker. Games already merged for a pitcher and pitch type are ignored.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The new statcast data, e.g. the games of the previous day for the whole league.
+
+        Returns
+        -------
+        pd.DataFrame
+            The alerts: one row per (pitcher, pitch_type, game, column) significantly below the baseline.
+        """
+        games = aggregate_games(data, self.columns)
+        keys = list(zip(games.index.get_level_values('pitcher'), games.index.get_level_values('pitch_type'), games['game_pk']))
+        new = [key not in self.seen for key in keys]
+        games = games[new]
+        self.seen.update(key for key, is_new in zip(keys, new) if is_new)
+        alerts = []
+        # Games are merged in order: first the first new game of every pitcher and pitch type, then the second, etc.
+        # so that a pitcher's games of the batch are tested against the previous ones
+        steps = games.groupby(level=['pitcher', 'pitch_type']).cumcount().to_numpy()
+        for step in np.unique(steps):
+            step_games = games[steps == step]
+            alerts.append(self._test(step_games))
+            self._merge(step_games)
+            self._remember(step_games)
+        if not alerts:
+            return pd.DataFrame(columns=['pitcher', 'pitch_type', 'player_name', 'game_pk', 'game_date', 'column', 'pitches', 'game_mean', 'baseline_mean', 'ewm', 'drop', 'z'])
+        return pd.concat(alerts, ignore_index=True)
+
+    def _test(self, day: pd.DataFrame) -> pd.DataFrame:
+        base = self.state.reindex(day.index)
+        alerts = []
+        for col in self.columns:
+            base_n = base[f'{col}_n'].astype(float)
+            base_mean = base[f'{col}_mean'].astype(float)
+            base_std = np.sqrt(base[f'{col}_m2'].astype(float) / (base_n - 1))
+            game_n = day[f'{col}_n']
+            game_mean = day[f'{col}_mean']
+            z = (game_mean - base_mean) / (base_std / np.sqrt(game_n))
+            flagged = (base_n >= self.min_baseline) & (game_n >= self.min_pitches) & (z <= -self.z_threshold)
+            flagged = flagged.to_numpy()
+            alerts.append(pd.DataFrame({
+                'player_name': day['player_name'][flagged],
+                'game_pk': day['game_pk'][flagged],
+                'game_date': day['game_date'][flagged],
+                'column': col,
+                'pitches': game_n[flagged],
+                'game_mean': game_mean[flagged],
+                'baseline_mean': base_mean[flagged],
+                'ewm': base[f'{col}_ewm'][flagged],
+                'drop': (base_mean - game_mean)[flagged],
+                'z': z[flagged],
+            }))
+        return pd.concat(alerts).reset_index()
+
+    def _merge(self, day: pd.DataFrame) -> None:
+        state = self.state.reindex(self.state.index.union(day.index))
+        base = state.loc[day.index]
+        merged = pd.DataFrame(index=day.index)
+        merged['player_name'] = day['player_name']
+        # Late rows of an older game must not move the last game back
+        merged['last_game'] = pd.concat([pd.to_datetime(base['last_game']), day['game_date']], axis=1).max(axis=1)
+        for col in self.columns:
+            # Parallel update of the running mean and variance (Chan et al.)
+            n_a = base[f'{col}_n'].astype(float).fillna(0)
+            mean_a = base[f'{col}_mean'].astype(float).fillna(0)
+            m2_a = base[f'{col}_m2'].astype(float).fillna(0)
+            n_b = day[f'{col}_n']
+            mean_b = day[f'{col}_mean'].fillna(0)
+            n = n_a + n_b
+            delta = mean_b - mean_a
+            merged[f'{col}_n'] = n
+            merged[f'{col}_mean'] = (mean_a + delta * n_b / n).where(n > 0)
+            merged[f'{col}_m2'] = (m2_a + day[f'{col}_m2'] + delta ** 2 * n_a * n_b / n).where(n > 0, 0)
+            # The exponentially weighted mean starts at the first game mean, and skips games without a value
+            ewm = base[f'{col}_ewm'].astype(float)
+            game_mean = day[f'{col}_mean']
+            merged[f'{col}_ewm'] = (ewm + self.alpha * (game_mean - ewm)).fillna(ewm).fillna(game_mean)
+        state.loc[day.index, merged.columns] = merged
+        self.state = state
+
+    def _remember(self, day: pd.DataFrame) -> None:
+        counts = day[[f'{col}_n' for col in self.columns]].to_numpy(dtype=float)
+        means = day[[f'{col}_mean' for col in self.columns]].to_numpy(dtype=float)
+        for key, game_counts, game_means in zip(day.index, counts, means):
+            if key not in self.recent:
+                self.recent[key] = deque(maxlen=self.window)
+            self.recent[key].append((game_counts, game_means))
+
+    def baseline(self) -> pd.DataFrame:
+        """
+        Get the baseline of every pitcher and pitch type.
+
+        Returns
+        -------
+        pd.DataFrame
+            The number of pitches, mean, standard deviation and exponentially weighted mean of every column,
+            indexed by (pitcher, pitch_type).
+        """
+        baseline = self.state[['player_name', 'last_game']].copy()
+        for col in self.columns:
+            n = self.state[f'{col}_n'].astype(float)
+            baseline[f'{col}_n'] = n
+            baseline[f'{col}_mean'] = self.state[f'{col}_mean'].astype(float)
+            baseline[f'{col}_std'] = np.sqrt(self.state[f'{col}_m2'].astype(float) / (n - 1))
+            baseline[f'{col}_ewm'] = self.state[f'{col}_ewm'].astype(float)
+        return baseline
+
+    def rolling(self) -> pd.DataFrame:
+        """
+        Get the mean of every column over the last games of every pitcher and pitch type.
+
+        Returns
+        -------
+        pd.DataFrame
+            The pitch weighted mean of every column over the last `window` games, indexed by (pitcher, pitch_type).
+        """
+        rows = []
+        for games in self.recent.values():
+            counts = np.array([game_counts for game_counts, _ in games])
+            means = np.array([game_means for _, game_means in games])
+            totals = np.nansum(counts * means, axis=0)
+            pitches = counts.sum(axis=0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rows.append([len(games)] + list(np.where(pitches > 0, totals / pitches, np.nan)))
+        index = pd.MultiIndex.from_tuples(list(self.recent), names=['pitcher', 'pitch_type'])
+        return pd.DataFrame(rows, index=index, columns=['games'] + [f'{col}_mean' for col in self.columns])
+
+    def save(self, path: str) -> None:
+        """
+        Save the tracker to a file.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file.
+
+        Returns
+        -------
+        None
+        """
+        with open(path, 'wb') as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(path: str) -> 'PitchTrendTracker':
+        """
+        Load a tracker from a file.
+
+        Parameters
+        ----------
+        path : str
+            The path of the file.
+
+        Returns
+        -------
+        PitchTrendTracker
+            The tracker.
+        """
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+def sweep_league(tracker: PitchTrendTracker, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+    """
+    Update a tracker with the games of the whole league over a period, e.g. yesterday's games every night.
+
+    Parameters
+    ----------
+    tracker : PitchTrendTracker
+        The tracker.
+    start_date : str
+        The start date of the period (format: 'YYYY-MM-DD') (default: None, which means yesterday)
+    end_date : str
+        The end date of the period (format: 'YYYY-MM-DD') (default: None)
+
+    Returns
+    -------
+    pd.DataFrame
+        The alerts raised by the new games.
+    """
+    data = get_statcast(None, start_date, end_date)
+    return tracker.update(data)
+
+if __name__ == '__main__':
+    tracker_file = 'pitch_trends.pkl'
+    try:
+        tracker = PitchTrendTracker.load(tracker_file)
+    except FileNotFoundError:
+        tracker = PitchTrendTracker()
+    alerts = sweep_league(tracker)
+    tracker.save(tracker_file)
+    print(alerts.sort_values('z').to_string())
@@ -1,8 +1,13 @@
 import os
+import asyncio
 import pybaseball
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from statcast import StatcastRequest, fetch_statcast
+from figure_writer import save_figure, enable_background_writes, flush_figures
+from season_store import SeasonStore, build_season_store
 
 #TODO: Move statcast pitcher report for a single game in this file. 
 #(or not, considering that it is a single game, and not a season)
@@ -24,7 +29,7 @@ def get_player_id(name: str) -> int:
     player_id = pybaseball.playerid_lookup(name.split()[1], name.split()[0])
     return player_id['key_mlbam'][0]
 
-def get_pitcher_data(player_id: int, year: str) -> pd.DataFrame:
+def get_pitcher_data(player_id: int, year: str, store: SeasonStore = None) -> pd.DataFrame:
     """
     Get the data of a pitcher.
 
@@ -34,13 +39,25 @@ def get_pitcher_data(player_id: int, year: str) -> pd.DataFrame:
         The player id of the pitcher.
     year : str
         The year of the data.
+    store : SeasonStore, optional
+        The store of the season, to read the data from instead of downloading it. The default is None.
 
     Returns
     -------
     pd.DataFrame
         The data of the pitcher.
     """
-    return pybaseball.statcast_pitcher(f'{year}-01-01', f'{year}-12-31', player_id)
+    if store is not None:
+        return store.pitcher(player_id)
+    # Served from a league-wide download of the same season if one is in flight
+    request = StatcastRequest(f'{year}-01-01', f'{year}-12-31', None, None, player_id)
+    return fetch_statcast(request, lambda: pybaseball.statcast_pitcher(f'{year}-01-01', f'{year}-12-31', player_id))
+
+async def get_pitcher_data_async(player_id: int, year: str, store: SeasonStore = None) -> pd.DataFrame:
+    """
+    Same as get_pitcher_data, for asyncio callers (coalesced with the thread callers).
+    """
+    return await asyncio.get_running_loop().run_in_executor(None, get_pitcher_data, player_id, year, store)
 
 def create_boxplot_report_pitcher(data: pd.DataFrame, pitcher_name: str, year: str) -> None:
     """
@@ -68,20 +85,21 @@ def create_boxplot_report_pitcher(data: pd.DataFrame, pitcher_name: str, year: s
         pitch_types = data['pitch_type'].unique()
         for pitch_type in pitch_types:
             pitch_data = data[data['pitch_type'] == pitch_type]
-            dates = pitch_data['game_date'].unique()
+            # Oldest game first, whatever the order of the data (newest first from pybaseball, oldest first from a SeasonStore)
+            dates = np.sort(pitch_data['game_date'].unique())
             fig = plt.figure(figsize=(12, 8))
             for i in range(len(dates)):
                 date = dates[i]
                 gameday_data = pitch_data[pitch_data['game_date'] == date]
                 home_team = gameday_data['home_team'].unique()[0]
                 away_team = gameday_data['away_team'].unique()[0]
-                plt.boxplot(gameday_data[col], positions=[len(dates) - i], widths=0.5, labels=[date + '\n' + away_team + ' @ ' + home_team])
+                # Dates are strings when downloaded for a single pitcher, but datetimes in league-wide data
+                plt.boxplot(gameday_data[col], positions=[i + 1], widths=0.5, labels=[str(date)[:10] + '\n' + away_team + ' @ ' + home_team])
             # Set the title of the figure
             plt.title(f"{pitcher_name}'s {pitch_type} {col} during {year}")
             plt.xlabel("Date")
             plt.ylabel(col)
-            plt.savefig(f"{outfolder}/{pitch_type}_{col}.png")
-            plt.close(fig)
+            save_figure(fig, f"{outfolder}/{pitch_type}_{col}.png")
 
 def create_boxplot_report(pitcher_name: str, year: str):
     """
@@ -146,8 +164,7 @@ def create_kernel_report_pitcher(data: pd.DataFrame, pitcher_name: str, year: st
         sns.kdeplot(x=pitch_data['plate_x'], y=pitch_data['plate_z'], cmap='Reds', shade=True, thresh=0.05, n_levels=40)#, cbar=True, cbar_kws={'label': 'Density'})
 
         # Save the plot
-        plt.savefig(f"{outfolder}/{pitch_type}_kernel.png")
-        plt.close()
+        save_figure(plt.gcf(), f"{outfolder}/{pitch_type}_kernel.png")
 
 def create_kernel_report(pitcher_name: str, year: str) -> None:
     """
@@ -168,6 +185,30 @@ def create_kernel_report(pitcher_name: str, year: str) -> None:
     data = get_pitcher_data(pitcher_id, year)
     create_kernel_report_pitcher(data, pitcher_name, year)
 
+def create_league_report(year: str, store: SeasonStore = None) -> None:
+    """
+    Create the boxplot and kernel reports of every pitcher of the league during a year, from a season store.
+
+    Parameters
+    ----------
+    year : str
+        The year of the data.
+    store : SeasonStore, optional
+        The store of the season. The default is None, which means it is built from the league-wide data.
+
+    Returns
+    -------
+    None
+    """
+    if store is None:
+        store = build_season_store(year)
+    for _, data in store.iter_pitchers():
+        pitcher_name = data['player_name'].iloc[0]
+        create_boxplot_report_pitcher(data, pitcher_name, year)
+        create_kernel_report_pitcher(data, pitcher_name, year)
+
 if __name__ == "__main__":
+    enable_background_writes()
     create_boxplot_report("Chris Sale", "2023")
     create_kernel_report("Chris Sale", "2023")
+    flush_figures()
@@ -0,0 +1,203 @@
+import threading
+import time
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from statcast import get_statcast, generate_all_release, generate_all_homeplate, in_play_report, generate_all_boxplot_report, create_radar_report, mlb_teams
+from umpscorecard import report_wrong_calls
+from figure_writer import enable_background_writes, flush_figures
+
+# pyplot keeps a global current figure, so the nodes drawing with it must not run at the same time
+pyplot_lock = threading.Lock()
+
+class Node:
+    """
+    A task of a report graph: a function called with the results of the nodes it depends on.
+    """
+
+    def __init__(self, name: str, func, deps: list = [], retries: int = 0, lock: threading.Lock = None, backoff: float = 1):
+        """
+        Parameters
+        ----------
+        name : str
+            The name of the node.
+        func : callable
+            The function to run, called with the results of deps, in order.
+        deps : list, optional
+            The names of the nodes this node depends on. The default is [].
+        retries : int, optional
+            How many times to retry the function if it raises. The default is 0.
+        lock : threading.Lock, optional
+            A lock held while running the function, e.g. pyplot_lock. The default is None.
+        backoff : float, optional
+            The delay in seconds before the first retry, doubled before each following one. The default is 1.
+        """
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.retries = retries
+        self.lock = lock
+        self.backoff = backoff
+        self.status = 'pending'
+        self.result = None
+        self.error = None
+        self.attempts = 0
+        self.duration = 0
+
+class ReportGraph:
+    """
+    Runner of a graph of fetches and reports.
+
+    Every node runs once, as soon as all of its dependencies succeeded, so a fetched frame is shared by all the
+    reports depending on it and independent nodes run concurrently. A failing node is retried, then marked as failed,
+    and the nodes depending on it are skipped without stopping the rest of the graph.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+
+    def add(self, name: str, func, deps: list = [], retries: int = 0, lock: threading.Lock = None, backoff: float = 1) -> None:
+        """
+        Add a node to the graph. See Node for the parameters.
+
+        Returns
+        -------
+        None
+        """
+        if name in self.nodes:
+            raise ValueError(f'node {name} already exists')
+        for dep in deps:
+            if dep not in self.nodes:
+                raise ValueError(f'node {name} depends on unknown node {dep}')
+        self.nodes[name] = Node(name, func, deps, retries, lock, backoff)
+
+    def _run_node(self, node: Node):
+        args = [self.nodes[dep].result for dep in node.deps]
+        start = time.time()
+        try:
+            while True:
+                node.attempts += 1
+                try:
+                    if node.lock is None:
+                        return node.func(*args)
+                    with node.lock:
+                        return node.func(*args)
+                except Exception:
+                    if node.attempts > node.retries:
+                        raise
+                # Wait before retrying, without holding the lock, as a failed fetch often fails again right away
+                time.sleep(node.backoff * 2 ** (node.attempts - 1))
+        finally:
+            node.duration = time.time() - start
+
+    def run(self, max_workers: int = 8) -> dict:
+        """
+        Run every node of the graph, then print a summary.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            The maximum number of nodes running at the same time. The default is 8.
+
+        Returns
+        -------
+        dict
+            The result of every node that succeeded, by name.
+        """
+        running = {}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            while True:
+                for node in self.nodes.values():
+                    if node.status != 'pending':
+                        continue
+                    dep_status = [self.nodes[dep].status for dep in node.deps]
+                    if any(status in ['failed', 'skipped'] for status in dep_status):
+                        node.status = 'skipped'
+                    elif all(status == 'done' for status in dep_status):
+                        node.status = 'running'
+                        running[executor.submit(self._run_node, node)] = node
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    node = running.pop(future)
+                    try:
+                        node.result = future.result()
+                        node.status = 'done'
+                    except Exception as e:
+                        node.error = e
+                        node.status = 'failed'
+        print(self.summary().to_string())
+        return {name: node.result for name, node in self.nodes.items() if node.status == 'done'}
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Get the status of every node.
+
+        Returns
+        -------
+        pd.DataFrame
+            The status, number of attempts, duration in seconds and error of every node.
+        """
+        return pd.DataFrame(
+            [[node.status, node.attempts, round(node.duration, 2), repr(node.error) if node.error is not None else ''] for node in self.nodes.values()],
+            index=list(self.nodes),
+            columns=['status', 'attempts', 'duration', 'error'])
+
+def unless_empty(report):
+    """
+    Wrap a report so that it does nothing when the team has no data.
+
+    Parameters
+    ----------
+    report : callable
+        The report, called with the data and any other argument.
+
+    Returns
+    -------
+    callable
+        The wrapped report.
+    """
+    def wrapped(data: pd.DataFrame, *args):
+        if data.empty:
+            return None
+        return report(data, *args)
+    return wrapped
+
+def build_daily_graph(teams: list = mlb_teams, start_date: str = None, end_date: str = None) -> ReportGraph:
+    """
+    Build the graph of the reports of statcast.py and umpscorecard.py for every team, each team being fetched once.
+
+    Parameters
+    ----------
+    teams : list, optional
+        The teams' abbreviations. The default is mlb_teams.
+    start_date : str
+        The start date of the period to get the data from (format: 'YYYY-MM-DD') (default: None)
+    end_date : str
+        The end date of the period to get the data from (format: 'YYYY-MM-DD') (default: None)
+
+    Returns
+    -------
+    ReportGraph
+        The graph, ready to run.
+    """
+    graph = ReportGraph()
+    for team in teams:
+        fetch = f'fetch_{team}'
+        graph.add(fetch, lambda team=team: get_statcast(team=team, start_date=start_date, end_date=end_date), retries=2)
+        reports = {
+            'release': generate_all_release,
+            'homeplate': generate_all_homeplate,
+            'in_play': lambda data, team=team: in_play_report(data, team),
+            'boxplot': generate_all_boxplot_report,
+            'radar': lambda data, team=team: create_radar_report(data, team),
+            'ump': lambda data, team=team: report_wrong_calls(data, team),
+        }
+        for name, report in reports.items():
+            graph.add(f'{name}_{team}', unless_empty(report), deps=[fetch], lock=pyplot_lock)
+    return graph
+
+if __name__ == '__main__':
+    enable_background_writes()
+    build_daily_graph().run()
+    flush_figures()
@@ -0,0 +1,155 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+from statcast import get_statcast
+
+class SeasonStore:
+    """
+    Season of league-wide statcast data on disk, sorted by pitcher, with one memory-mapped file per column.
+
+    An offset index gives the rows of every pitcher, so getting a pitcher's season only reads their rows from the
+    memory-mapped columns, and iterating over all the pitchers reads the files sequentially. Text columns are stored
+    as integer codes and their categories, dates as int64 nanoseconds, booleans as uint8. Nullable integer and boolean
+    columns (as returned by pybaseball) also get a mask file of their missing values, and are read back nullable.
+    """
+
+    def __init__(self, root: str):
+        """
+        Parameters
+        ----------
+        root : str
+            The folder of the store, as written by SeasonStore.build.
+        """
+        self.root = root
+        with open(os.path.join(root, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self.pitchers = np.load(os.path.join(root, 'pitchers.npy'))
+        self.offsets = np.load(os.path.join(root, 'offsets.npy'))
+        self._columns = {col: np.load(os.path.join(root, f'{i}.npy'), mmap_mode='r') for i, col in enumerate(self.meta['columns'])}
+        self._masks = {col: np.load(os.path.join(root, f'{i}_mask.npy'), mmap_mode='r') for i, col in enumerate(self.meta['columns']) if col in self.meta.get('masks', [])}
+        # None at the end, so that the code -1 of missing values maps to None
+        self._categories = {col: np.array(categories + [None], dtype=object) for col, categories in self.meta['categories'].items()}
+
+    @staticmethod
+    def build(data: pd.DataFrame, root: str) -> 'SeasonStore':
+        """
+        Write a season of statcast data as a store.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The statcast data of the whole league.
+        root : str
+            The folder of the store.
+
+        Returns
+        -------
+        SeasonStore
+            The store.
+        """
+        data = data[data['pitcher'].notna()]
+        order = [col for col in ['pitcher', 'game_date', 'at_bat_number', 'pitch_number'] if col in data.columns]
+        data = data.sort_values(order, kind='mergesort', ignore_index=True)
+        if not os.path.exists(root):
+            os.makedirs(root)
+        meta = {'columns': list(data.columns), 'kinds': {}, 'categories': {}, 'masks': []}
+        for i, col in enumerate(data.columns):
+            series = data[col]
+            nullable = pd.api.types.is_extension_array_dtype(series)
+            if pd.api.types.is_datetime64_any_dtype(series):
+                meta['kinds'][col] = 'datetime'
+                values = series.to_numpy(dtype='datetime64[ns]').view('int64')
+            elif pd.api.types.is_bool_dtype(series):
+                meta['kinds'][col] = 'boolean'
+                values = series.to_numpy(dtype='uint8', na_value=0)
+            elif pd.api.types.is_integer_dtype(series) and nullable:
+                meta['kinds'][col] = 'integer'
+                values = series.to_numpy(dtype='int64', na_value=0)
+            elif pd.api.types.is_numeric_dtype(series):
+                meta['kinds'][col] = 'numeric'
+                values = series.to_numpy(dtype=float, na_value=np.nan) if nullable else series.to_numpy()
+            else:
+                meta['kinds'][col] = 'category'
+                values, categories = pd.factorize(series)
+                values = values.astype('int32')
+                # Categories keep their type when JSON has one for it
+                meta['categories'][col] = [category if isinstance(category, (str, bool, int, float)) else str(category) for category in categories.tolist()]
+            if meta['kinds'][col] in ['boolean', 'integer'] and nullable:
+                meta['masks'].append(col)
+                np.save(os.path.join(root, f'{i}_mask.npy'), series.isna().to_numpy())
+            np.save(os.path.join(root, f'{i}.npy'), values)
+        pitchers, starts = np.unique(data['pitcher'].to_numpy(dtype='int64'), return_index=True)
+        np.save(os.path.join(root, 'pitchers.npy'), pitchers)
+        np.save(os.path.join(root, 'offsets.npy'), np.append(starts, len(data)))
+        with open(os.path.join(root, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        return SeasonStore(root)
+
+    def _rows(self, start: int, stop: int) -> pd.DataFrame:
+        columns = {}
+        for col, values in self._columns.items():
+            rows = values[start:stop]
+            kind = self.meta['kinds'][col]
+            mask = np.array(self._masks[col][start:stop]) if col in self._masks else None
+            if kind == 'datetime':
+                columns[col] = rows.view('datetime64[ns]')
+            elif kind == 'boolean':
+                columns[col] = rows.astype(bool) if mask is None else pd.arrays.BooleanArray(rows.astype(bool), mask)
+            elif kind == 'integer':
+                columns[col] = pd.arrays.IntegerArray(np.array(rows), mask)
+            elif kind == 'category':
+                columns[col] = self._categories[col][rows]
+            else:
+                columns[col] = rows
+        return pd.DataFrame(columns)
+
+    def pitcher(self, pitcher_id: int) -> pd.DataFrame:
+        """
+        Get the season of a pitcher.
+
+        Parameters
+        ----------
+        pitcher_id : int
+            The MLBAM id of the pitcher.
+
+        Returns
+        -------
+        pd.DataFrame
+            The pitches of the pitcher, in the order of the games (empty if they did not pitch).
+        """
+        i = np.searchsorted(self.pitchers, pitcher_id)
+        if i == len(self.pitchers) or self.pitchers[i] != pitcher_id:
+            return self._rows(0, 0)
+        return self._rows(self.offsets[i], self.offsets[i + 1])
+
+    def iter_pitchers(self):
+        """
+        Iterate over the seasons of all the pitchers, in the order of the store.
+
+        Yields
+        ------
+        int, pd.DataFrame
+            The id of the pitcher and their pitches.
+        """
+        for i, pitcher_id in enumerate(self.pitchers):
+            yield pitcher_id, self._rows(self.offsets[i], self.offsets[i + 1])
+
+def build_season_store(year: str, root: str = None) -> SeasonStore:
+    """
+    Fetch the league-wide data of a season and write it as a store.
+
+    Parameters
+    ----------
+    year : str
+        The season.
+    root : str, optional
+        The folder of the store. The default is None, which means 'season_{year}'.
+
+    Returns
+    -------
+    SeasonStore
+        The store.
+    """
+    data = get_statcast(None, f'{year}-01-01', f'{year}-12-31')
+    return SeasonStore.build(data, root if root is not None else f'season_{year}')
@@ -0,0 +1,84 @@
+import threading
+
+class Flight:
+    """
+    A request being fetched, that other callers can wait on.
+    """
+
+    def __init__(self, key):
+        self.key = key
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """
+    Coalescing of concurrent requests, so that the same data is only fetched once at a time.
+
+    The first caller of a key (the leader) runs the fetch, while the callers of the same key, or of a key covered
+    by a request in flight, wait for the leader's result and get it through the subset function, e.g. a filter of
+    the leader's frame. Once fetched, a request leaves the flight: results are not cached.
+    asyncio callers can use it through loop.run_in_executor, so they are coalesced with the thread callers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def in_flight(self) -> list:
+        """
+        Get the keys of the requests in flight.
+
+        Returns
+        -------
+        list
+            The keys.
+        """
+        with self._lock:
+            return list(self._flights)
+
+    def do(self, key, func, covers=None, subset=None):
+        """
+        Fetch a key, or wait for the request in flight fetching it.
+
+        Parameters
+        ----------
+        key : hashable
+            The key of the request.
+        func : callable
+            The fetch, called without arguments if this caller is the leader.
+        covers : callable, optional
+            covers(leader_key, key) tells whether the result of leader_key contains the result of key. The default
+            is None, which means only identical keys are coalesced.
+        subset : callable, optional
+            subset(result, key) extracts the result of key from the result of the leader. The default is None,
+            which means the followers get the leader's result as is.
+
+        Returns
+        -------
+        object
+            The result of the fetch.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None and covers is not None:
+                flight = next((other for other in self._flights.values() if covers(other.key, key)), None)
+            leader = flight is None
+            if leader:
+                flight = Flight(key)
+                self._flights[key] = flight
+        if leader:
+            try:
+                flight.result = func()
+            except Exception as e:
+                flight.error = e
+                raise
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+            return flight.result
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result if subset is None else subset(flight.result, key)
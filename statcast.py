@@ -1,10 +1,16 @@
 import pybaseball
 import statsapi
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
+import asyncio
 import os
 import time
 import math
+import datetime
+from collections import namedtuple
+from single_flight import SingleFlight
+from figure_writer import save_figure, enable_background_writes, flush_figures
 
 # Create list of MLB teams
 mlb_teams = ['AZ', 'ATL', 'BAL', 'BOS', 'CHC', 'CWS', 'CIN', 'CLE', 'COL', 'DET', 'HOU', 'KC', 'LAA', 'LAD', 'MIA', 'MIL', 'MIN', 'NYM', 'NYY', 'OAK', 'PHI', 'PIT', 'SD', 'SEA', 'SF', 'STL', 'TB', 'TEX', 'TOR', 'WSH']
@@ -59,7 +65,8 @@ def create_report(
         outfolder: str,
         outfile: str,
         radar_zone: bool = False,
-        strike_zone: bool = False) -> None:
+        strike_zone: bool = False,
+        max_points: int = 20000) -> None:
     """
     Create a report of the data given a dataframe, the columns to plot, the legend and the mapping dictionary.
 
@@ -92,6 +99,10 @@ def create_report(
     strike_zone : bool
         Whether to plot the strike zone or not
 
+    max_points : int
+        The number of points above which the markers are rasterized and each legend category is sampled down
+        to its share of max_points, so that large frames (e.g. a whole season) render in bounded time (default: 20000)
+
     Returns
     -------
     None
@@ -99,7 +110,16 @@ def create_report(
     data['colour'] = data[legend].map(mapping_dictionary)
     # Drop rows when the value in the colour column is NaN
     data = data.dropna(subset=['colour'])
-    data.plot.scatter(x=plotting_columns[0], y=plotting_columns[1], c=data['colour'], figsize=(9.6, 7.2))#, edgecolors='black', linewidths=0.5)
+    rasterized = len(data) > max_points
+    if rasterized:
+        # Uniform sampling within each category keeps both the category mix and the density of the locations
+        fraction = max_points / len(data)
+        # Statcast frames can have a repeated index, which would not give the row order back
+        data = data.reset_index(drop=True)
+        data = data.groupby(legend, group_keys=False).apply(lambda group: group.sample(max(1, round(len(group) * fraction)), random_state=0))
+        # Back to the original row order, so that the categories stay interleaved instead of being drawn in layers
+        data = data.sort_index(kind='mergesort')
+    data.plot.scatter(x=plotting_columns[0], y=plotting_columns[1], c=data['colour'], figsize=(9.6, 7.2), rasterized=rasterized)#, edgecolors='black', linewidths=0.5)
     handles = [plt.Line2D([0], [0], marker='o', color='w', label=k, markerfacecolor=v, markersize=10) for k,v in mapping_dictionary.items()]
     
     if radar_zone:
@@ -141,8 +161,119 @@ def create_report(
 
     if not os.path.exists(outfolder):
         os.makedirs(outfolder)
-    plt.savefig(os.path.join(outfolder, outfile))
-    plt.close()
+    save_figure(plt.gcf(), os.path.join(outfolder, outfile))
+
+# Statcast downloads in flight, shared between the reports asking for overlapping data at the same time
+statcast_flights = SingleFlight()
+# opponents: the teams a team request plays on its single date, when known from the schedule
+StatcastRequest = namedtuple('StatcastRequest', ['start_date', 'end_date', 'team', 'game_pk', 'pitcher', 'opponents'], defaults=(None,))
+
+def covers_request(leader: StatcastRequest, request: StatcastRequest) -> bool:
+    """Whether the data of a request in flight contains the data of another request
+
+    A team request is covered by a league-wide request of the same period. It is covered by the request of another team
+    for the same single date only if, according to the schedule (opponents), its team only plays that team that day.
+
+    Parameters
+    ----------
+    leader : StatcastRequest
+        The request in flight
+
+    request : StatcastRequest
+        The new request
+
+    Returns
+    -------
+    bool
+        Whether the new request can be served by filtering the data of the request in flight
+    """
+    if not isinstance(leader, StatcastRequest):
+        return False
+    if leader.game_pk is not None:
+        return leader.game_pk == request.game_pk and (leader.pitcher is None or leader.pitcher == request.pitcher)
+    if leader.team is not None and request.team is not None and leader.team != request.team:
+        # Both clubs of the same games: the data of the leader contains every pitch of the games of the new request
+        return (leader.pitcher is None and request.opponents == (leader.team,)
+                and leader.start_date is not None and (leader.start_date, leader.end_date) == (request.start_date, request.end_date))
+    for field in ['team', 'pitcher']:
+        if getattr(leader, field) is not None and getattr(leader, field) != getattr(request, field):
+            return False
+    if (leader.start_date, leader.end_date) == (request.start_date, request.end_date):
+        return True
+    # Otherwise, both periods must be given and the new one inside the one in flight
+    dates = [leader.start_date, leader.end_date, request.start_date, request.end_date]
+    return None not in dates and leader.start_date <= request.start_date and request.end_date <= leader.end_date
+
+def subset_request(data: pd.DataFrame, request: StatcastRequest) -> pd.DataFrame:
+    """Filter the data of a request in flight to the data of a request it covers
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The statcast data of the request in flight
+
+    request : StatcastRequest
+        The covered request
+
+    Returns
+    -------
+    pd.DataFrame
+        The statcast data of the covered request
+    """
+    # pybaseball returns nullable columns (e.g. Int64), whose comparisons give pd.NA for missing values
+    mask = np.ones(len(data), dtype=bool)
+    if request.team is not None:
+        mask &= ((data['home_team'] == request.team) | (data['away_team'] == request.team)).to_numpy(dtype=bool, na_value=False)
+    if request.game_pk is not None:
+        mask &= (data['game_pk'] == request.game_pk).to_numpy(dtype=bool, na_value=False)
+    if request.pitcher is not None:
+        mask &= (data['pitcher'] == request.pitcher).to_numpy(dtype=bool, na_value=False)
+    if request.start_date is not None and request.end_date is not None:
+        game_dates = pd.to_datetime(data['game_date'])
+        mask &= ((game_dates >= request.start_date) & (game_dates <= request.end_date)).to_numpy(dtype=bool, na_value=False)
+    return data[mask]
+
+def fetch_statcast(request: StatcastRequest, fetch) -> pd.DataFrame:
+    """Run a statcast download, or wait for the download in flight covering it
+
+    Parameters
+    ----------
+    request : StatcastRequest
+        The request
+
+    fetch : callable
+        The download, called without arguments if no download in flight covers the request
+
+    Returns
+    -------
+    pd.DataFrame
+        The statcast data of the request
+    """
+    return statcast_flights.do(request, fetch, covers_request, subset_request)
+
+def get_opponents(team: str, date: str) -> tuple:
+    """Get the teams a team plays on a date
+
+    Parameters
+    ----------
+    team : str
+        The team's abbreviation (e.g. 'BOS' for Boston Red Sox)
+
+    date : str
+        The date (format: 'YYYY-MM-DD')
+
+    Returns
+    -------
+    tuple
+        The sorted abbreviations of the opponents (empty if the team does not play), or None if the schedule is unavailable
+    """
+    try:
+        abbreviations = {t['id']: t['abbreviation'] for t in statsapi.get('teams', {'sportId': 1})['teams']}
+        team_id = next(team_id for team_id, abbreviation in abbreviations.items() if abbreviation == team)
+        games = statsapi.schedule(date=date, team=team_id)
+    except Exception:
+        return None
+    return tuple(sorted({abbreviations.get(game['away_id'] if game['home_id'] == team_id else game['home_id']) for game in games}))
 
 def get_statcast(team: str, start_date:str = None, end_date: str = None) -> pd.DataFrame:
     """Get the last game statcast data for a team""
@@ -150,7 +281,7 @@ def get_statcast(team: str, start_date:str = None, end_date: str = None) -> pd.D
     Parameters
     ----------
     team : str
-        The team's abbreviation (e.g. 'BOS' for Boston Red Sox)
+        The team's abbreviation (e.g. 'BOS' for Boston Red Sox), or None for the whole league
     
     start_date : str
         The start date of the period to get the data from (format: 'YYYY-MM-DD') (default: None)
@@ -163,7 +294,22 @@ def get_statcast(team: str, start_date:str = None, end_date: str = None) -> pd.D
     pd.DataFrame
         The last game statcast data for the team
     """
-    return pybaseball.statcast(team=team, start_dt=start_date, end_dt=end_date)
+    # Same default period as pybaseball: yesterday
+    if start_date is None:
+        start_date = (datetime.date.today() - datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+    if end_date is None:
+        end_date = start_date
+    request = StatcastRequest(start_date, end_date, team, None, None)
+    # The download of another team in flight may contain the games of this team, which is only known from the schedule
+    if team is not None and start_date == end_date and any(
+            isinstance(key, StatcastRequest) and key.team not in [None, team] and key.game_pk is None and key.pitcher is None
+            and (key.start_date, key.end_date) == (start_date, end_date) for key in statcast_flights.in_flight()):
+        request = request._replace(opponents=get_opponents(team, start_date))
+    return fetch_statcast(request, lambda: pybaseball.statcast(team=team, start_dt=start_date, end_dt=end_date))
+
+async def get_statcast_async(team: str, start_date:str = None, end_date: str = None) -> pd.DataFrame:
+    """Same as get_statcast, for asyncio callers (coalesced with the thread callers)"""
+    return await asyncio.get_running_loop().run_in_executor(None, get_statcast, team, start_date, end_date)
 
 def get_statcast_gamePk(gamePk: int) -> pd.DataFrame:
     """Get the statcast data for a gamePk
@@ -178,7 +324,16 @@ def get_statcast_gamePk(gamePk: int) -> pd.DataFrame:
     pd.DataFrame
         The statcast data for the game
     """
-    return pybaseball.statcast_single_game(gamePk)
+    request = StatcastRequest(None, None, None, gamePk, None)
+    # A league-wide download in flight may contain the game, which is only known from the date of the game
+    if any(isinstance(key, StatcastRequest) and key.team is None and key.game_pk is None and key.pitcher is None for key in statcast_flights.in_flight()):
+        game_date = statsapi.schedule(game_id=gamePk)[0]['game_date']
+        request = request._replace(start_date=game_date, end_date=game_date)
+    return fetch_statcast(request, lambda: pybaseball.statcast_single_game(gamePk))
+
+async def get_statcast_gamePk_async(gamePk: int) -> pd.DataFrame:
+    """Same as get_statcast_gamePk, for asyncio callers (coalesced with the thread callers)"""
+    return await asyncio.get_running_loop().run_in_executor(None, get_statcast_gamePk, gamePk)
 
 def get_lastgame_pitchers(data: pd.DataFrame) -> list:
     """Get the pitchers who pitched in the last game
@@ -338,8 +493,7 @@ def generate_boxplot_report_by_pitcher(data: pd.DataFrame, pitcher: str) -> None
         # Save the figure
         fig.suptitle(f"{pitch} for {pitcher} on {gamedate} [{away_team}@{home_team}]")
         filename = f"{pitcher}_{pitch}_{gamedate}.png"
-        fig.savefig(os.path.join(outfolder, filename))
-        plt.close(fig)
+        save_figure(fig, os.path.join(outfolder, filename))
 
 def generate_all_boxplot_report(data: pd.DataFrame) -> None:
     """
@@ -419,6 +573,7 @@ def in_play_report(data: pd.DataFrame, team: str) -> None:
     )
 
 if __name__ == '__main__':
+    enable_background_writes()
     for team in mlb_teams:
         data = get_statcast(team=team)
         if data.empty:
@@ -428,4 +583,5 @@ if __name__ == '__main__':
         generate_all_homeplate(data)
         in_play_report(data, team)
         generate_all_boxplot_report(data)
-        create_radar_report(data, team)
\ No newline at end of file
+        create_radar_report(data, team)
+    flush_figures()
\ No newline at end of file
@@ -0,0 +1,31 @@
+import pandas as pd
+import pitcher_report
+
+def pitcher_frame() -> pd.DataFrame:
+    # Newest game first, as returned by pybaseball.statcast_pitcher
+    return pd.DataFrame({
+        'game_date': ['2023-04-12', '2023-04-12', '2023-04-06', '2023-04-01'],
+        'pitch_type': ['FF', 'FF', 'FF', 'FF'],
+        'home_team': ['BOS', 'BOS', 'NYY', 'BOS'],
+        'away_team': ['TB', 'TB', 'BOS', 'BAL'],
+        'release_speed': [95.1, 94.8, 94.2, 95.5],
+        'effective_speed': [94.0, 93.9, 93.1, 94.6],
+        'release_spin_rate': [2300, 2310, 2280, 2295],
+    })
+
+def boxplot_positions(data: pd.DataFrame, monkeypatch, tmp_path) -> list:
+    boxes = []
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(pitcher_report.plt, 'boxplot', lambda values, positions, widths, labels: boxes.append((positions[0], labels[0][:10])))
+    monkeypatch.setattr(pitcher_report, 'save_figure', lambda fig, path: pitcher_report.plt.close(fig))
+    pitcher_report.create_boxplot_report_pitcher(data, 'pitcher', '2023')
+    # One box per date for each of the three columns
+    return sorted(set(boxes))
+
+def test_boxplot_dates_oldest_first(monkeypatch, tmp_path):
+    newest_first = pitcher_frame()
+    # A SeasonStore slice: oldest game first, with datetime dates
+    store_slice = newest_first.iloc[::-1].assign(game_date=lambda data: pd.to_datetime(data['game_date']))
+    positions = boxplot_positions(newest_first, monkeypatch, tmp_path)
+    assert [date for _, date in positions] == ['2023-04-01', '2023-04-06', '2023-04-12']
+    assert boxplot_positions(store_slice, monkeypatch, tmp_path) == positions
@@ -0,0 +1,58 @@
+import threading
+import time
+import pandas as pd
+from statcast import StatcastRequest, covers_request, fetch_statcast, statcast_flights, subset_request
+
+def league_frame() -> pd.DataFrame:
+    # Same nullable dtypes as the frames returned by pybaseball.statcast
+    return pd.DataFrame({
+        'game_date': pd.to_datetime(['2023-04-01', '2023-04-01', '2023-04-02', '2023-04-02']),
+        'game_pk': [1, 1, 2, None],
+        'pitcher': [10, 11, 10, None],
+        'home_team': ['BOS', 'BOS', 'LAD', 'LAD'],
+        'away_team': ['NYY', 'NYY', 'SF', 'SF'],
+        'release_speed': [95.1, None, 94.2, 88.0],
+    }).convert_dtypes(convert_string=False)
+
+def test_subset_request_on_nullable_columns():
+    data = league_frame()
+    pitcher = subset_request(data, StatcastRequest('2023-04-01', '2023-04-30', None, None, 10))
+    assert pitcher['release_speed'].tolist() == [95.1, 94.2]
+    game = subset_request(data, StatcastRequest(None, None, None, 1, None))
+    assert len(game) == 2
+    team = subset_request(data, StatcastRequest('2023-04-02', '2023-04-02', 'LAD', None, None))
+    assert len(team) == 2
+
+def test_team_covered_by_its_only_opponent():
+    leader = StatcastRequest('2023-04-01', '2023-04-01', 'BOS', None, None)
+    assert covers_request(leader, StatcastRequest('2023-04-01', '2023-04-01', 'NYY', None, None, ('BOS',)))
+    assert not covers_request(leader, StatcastRequest('2023-04-01', '2023-04-01', 'NYY', None, None))
+    assert not covers_request(leader, StatcastRequest('2023-04-01', '2023-04-01', 'NYY', None, None, ('BOS', 'TB')))
+    assert not covers_request(leader, StatcastRequest('2023-04-02', '2023-04-02', 'NYY', None, None, ('BOS',)))
+    team = subset_request(league_frame(), StatcastRequest('2023-04-01', '2023-04-01', 'NYY', None, None, ('BOS',)))
+    assert team['game_pk'].tolist() == [1, 1]
+
+def test_follower_served_from_league_wide_leader():
+    release = threading.Event()
+    results = {}
+
+    def leader_fetch():
+        release.wait()
+        return league_frame()
+
+    def follower_fetch():
+        raise AssertionError('the follower should not download')
+
+    leader = threading.Thread(target=lambda: results.update(leader=fetch_statcast(StatcastRequest('2023-04-01', '2023-04-30', None, None, None), leader_fetch)))
+    leader.start()
+    while not statcast_flights.in_flight():
+        time.sleep(0.01)
+    follower = threading.Thread(target=lambda: results.update(follower=fetch_statcast(StatcastRequest('2023-04-01', '2023-04-30', None, None, 10), follower_fetch)))
+    follower.start()
+    # Give the follower the time to join the flight before the leader finishes
+    time.sleep(0.1)
+    release.set()
+    leader.join()
+    follower.join()
+    assert len(results['leader']) == 4
+    assert results['follower']['pitcher'].tolist() == [10, 10]
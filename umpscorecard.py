@@ -1,6 +1,11 @@
 import pybaseball
 import pandas as pd
+import os
+import glob
+import pickle
+import uuid
 from statcast import create_report, mlb_teams
+from figure_writer import enable_background_writes, flush_figures
 
 calls = {
     'ball': 'green',
@@ -26,7 +31,96 @@ def prune_dataset(data: pd.DataFrame) -> pd.DataFrame:
     data = data[(data['description'] == 'called_strike') & (data.apply(lambda row: not inside_variable_strikezone(row['plate_x'], row['plate_z'], row['sz_top'], row['sz_bot']), axis=1)) | (data['description'] == 'ball') & (data.apply(lambda row: inside_variable_strikezone(row['plate_x'], row['plate_z'], row['sz_top'], row['sz_bot']), axis=1))]
     return data
 
-def report_wrong_calls(data: pd.DataFrame, team: str) -> None:
+class MissedCallLog:
+    """
+    Append-only log of the missed calls, partitioned by game date and game.
+
+    Rows are buffered in memory and written in bulk, each flush adding a new file to every partition it touches.
+    Files are written under a temporary name then renamed, so a reader never sees a half written file.
+    """
+
+    def __init__(self, root: str = 'missed_calls', buffer_rows: int = 10000):
+        """
+        Parameters
+        ----------
+        root : str, optional
+            The folder of the log. The default is 'missed_calls'.
+        buffer_rows : int, optional
+            The number of buffered rows after which the buffer is written. The default is 10000.
+        """
+        self.root = root
+        self.buffer_rows = buffer_rows
+        self._buffer = []
+        self._buffered = 0
+
+    def append(self, missed_calls: pd.DataFrame) -> None:
+        """
+        Add missed calls to the log.
+
+        Parameters
+        ----------
+        missed_calls : pd.DataFrame
+            The missed calls, with at least the game_date and game_pk columns.
+
+        Returns
+        -------
+        None
+        """
+        self._buffer.append(missed_calls)
+        self._buffered += len(missed_calls)
+        if self._buffered >= self.buffer_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        Write the buffered missed calls, one new file per game.
+
+        Returns
+        -------
+        None
+        """
+        if not self._buffer:
+            return
+        buffer = pd.concat(self._buffer, ignore_index=True)
+        self._buffer, self._buffered = [], 0
+        # A random name per flush, so that neither other logs nor other runs can overwrite the file
+        part = f"part-{uuid.uuid4().hex}.pkl"
+        for (game_date, game_pk), rows in buffer.groupby(['game_date', 'game_pk']):
+            folder = os.path.join(self.root, f"game_date={str(game_date)[:10]}", f"game_pk={game_pk}")
+            if not os.path.exists(folder):
+                os.makedirs(folder)
+            path = os.path.join(folder, part)
+            with open(path + '.tmp', 'xb') as f:
+                pickle.dump(rows.reset_index(drop=True), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + '.tmp', path)
+
+    def read(self, start_date: str = None, end_date: str = None) -> pd.DataFrame:
+        """
+        Read the log back as a single dataframe. Buffered rows are flushed first.
+
+        Parameters
+        ----------
+        start_date : str
+            The first game date to read (format: 'YYYY-MM-DD') (default: None)
+        end_date : str
+            The last game date to read (format: 'YYYY-MM-DD') (default: None)
+
+        Returns
+        -------
+        pd.DataFrame
+            The missed calls.
+        """
+        self.flush()
+        paths = []
+        for folder in sorted(glob.glob(os.path.join(self.root, 'game_date=*'))):
+            game_date = folder.rsplit('=', 1)[1]
+            if (start_date is None or game_date >= start_date) and (end_date is None or game_date <= end_date):
+                paths += sorted(glob.glob(os.path.join(folder, 'game_pk=*', '*.pkl')))
+        if not paths:
+            return pd.DataFrame()
+        return pd.concat([pd.read_pickle(path) for path in paths], ignore_index=True)
+
+def report_wrong_calls(data: pd.DataFrame, team: str, audit_log: MissedCallLog = None) -> None:
     """
     Create a report of the wrong calls of an umpire.
 
@@ -35,6 +129,9 @@ def report_wrong_calls(data: pd.DataFrame, team: str) -> None:
     data : pd.DataFrame
         The data of the team. 
             # It would be better to have the data of the whole game (both teams) but we can work with this for now.
+
+    audit_log : MissedCallLog
+        The log to append the missed calls to (default: None, which means they are not kept)
     
     Returns
     -------
@@ -44,8 +141,13 @@ def report_wrong_calls(data: pd.DataFrame, team: str) -> None:
     home_team = data['home_team'].unique()[0]
     away_team = data['away_team'].unique()[0]
     outfolder = f"ump_report_{gamedate}"
-    data = prune_dataset(data)
-    data.to_csv('data.csv')
+    if audit_log is not None:
+        # Statcast frames can have a repeated index, and the pruned rows are looked up by index below
+        data = data.reset_index(drop=True)
+    pruned = prune_dataset(data)
+    if audit_log is not None:
+        audit_log.append(data.loc[pruned.index, ['game_date', 'game_pk', 'home_team', 'away_team']].join(pruned).assign(team=team))
+    data = pruned
     pitcher_advantage, batter_advantage = compute_scorecard_team(data)
     return create_report(
         data,
@@ -112,8 +214,12 @@ def inside_variable_strikezone(pos_x: float, pos_z: float, sz_top: float, sz_bot
 
 if __name__ == '__main__':
     # Be careful with the dates especially when working at midnight ;)
+    enable_background_writes()
+    audit_log = MissedCallLog()
     for team in mlb_teams:
         data = pybaseball.statcast(team=team)
         if not data.empty:
-            report_wrong_calls(data, team)
+            report_wrong_calls(data, team, audit_log)
+    audit_log.flush()
+    flush_figures()
     # So far, this is (maybe still) incoherent with the @UmpScorecards twitter account. Have to double check.
\ No newline at end of file
@@ -0,0 +1,214 @@
+import os
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from figure_writer import save_figure
+
+# Same strike zone and 3x3 grid as drawn in statcast.py
+zone_x = [-0.7083, -0.2361, 0.2361, 0.7083]
+zone_z = [1.5, 2.1666, 2.8334, 3.5]
+# Pitches out of the zone by less than the extended zone margin are in the shadow, then in the chase region up to
+# chase_margin, and wasted beyond
+shadow_margin = 0.241667/2
+chase_margin = 0.5
+# Zones 1 to 9 are numbered as in Statcast: left to right, top to bottom, from the catcher's view
+zone_labels = [str(i) for i in range(1, 10)] + ['shadow', 'chase', 'waste']
+cube_levels = ['pitcher', 'pitch_type', 'count', 'outcome', 'zone']
+
+def zone_cells(plate_x: np.ndarray, plate_z: np.ndarray) -> np.ndarray:
+    """
+    Get the zone cell of every pitch, as a position in zone_labels.
+
+    Parameters
+    ----------
+    plate_x : np.ndarray
+        The x positions at the plate.
+    plate_z : np.ndarray
+        The z positions at the plate.
+
+    Returns
+    -------
+    np.ndarray
+        The positions in zone_labels.
+    """
+    column = np.digitize(plate_x, zone_x)
+    row = np.digitize(plate_z, zone_z)
+    inside = (column >= 1) & (column <= 3) & (row >= 1) & (row <= 3)
+    # Distance out of the zone, along the furthest axis
+    out_x = np.maximum(np.abs(plate_x) - zone_x[-1], 0)
+    out_z = np.maximum(np.maximum(zone_z[0] - plate_z, plate_z - zone_z[-1]), 0)
+    out = np.maximum(out_x, out_z)
+    return np.select(
+        [inside, out <= shadow_margin, out <= chase_margin],
+        [(3 - row) * 3 + column - 1, 9, 10],
+        11)
+
+def count_zones(data: pd.DataFrame, outcome: str = 'description') -> pd.Series:
+    """
+    Count the pitches by pitcher, pitch type, count, outcome and zone cell.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The statcast data.
+    outcome : str, optional
+        The outcome column, 'description' or 'events'. The default is 'description'.
+
+    Returns
+    -------
+    pd.Series
+        The non-zero counts, indexed by cube_levels.
+    """
+    data = data.dropna(subset=['plate_x', 'plate_z', 'pitch_type', 'balls', 'strikes', outcome])
+    keys = [
+        data['pitcher'],
+        data['pitch_type'],
+        data['balls'].astype(int).astype(str) + '-' + data['strikes'].astype(int).astype(str),
+        data[outcome],
+    ]
+    codes, levels = [], []
+    for key in keys:
+        key_codes, key_levels = pd.factorize(key)
+        codes.append(key_codes)
+        levels.append(key_levels)
+    codes.append(zone_cells(data['plate_x'].to_numpy(dtype=float), data['plate_z'].to_numpy(dtype=float)))
+    levels.append(pd.Index(zone_labels))
+    shape = [len(level) for level in levels]
+    flat = np.ravel_multi_index(codes, shape)
+    size = int(np.prod(shape))
+    # Dense counting is fastest, unless the cube of this batch is much bigger than the batch itself
+    if size <= 4 * len(flat):
+        counts = np.bincount(flat, minlength=size)
+        flat = np.flatnonzero(counts)
+        counts = counts[flat]
+    else:
+        flat, counts = np.unique(flat, return_counts=True)
+    index = pd.MultiIndex(levels=levels, codes=np.unravel_index(flat, shape), names=cube_levels)
+    return pd.Series(counts, index=index)
+
+class ZoneCube:
+    """
+    Counts of pitches by pitcher, pitch type, count, outcome and zone cell, updated game by game.
+
+    The counts are kept sparse, sorted by pitcher, so any slice is a few index lookups and a group by zone
+    on the selected counts, without going back to the pitches.
+    """
+
+    def __init__(self, outcome: str = 'description'):
+        """
+        Parameters
+        ----------
+        outcome : str, optional
+            The outcome column, 'description' or 'events'. The default is 'description'.
+        """
+        self.outcome = outcome
+        self.counts = pd.Series(dtype='int64', index=pd.MultiIndex.from_arrays([[]] * len(cube_levels), names=cube_levels))
+        self.games = set()
+
+    def update(self, data: pd.DataFrame) -> None:
+        """
+        Add the pitches of new games to the cube. Games already counted are ignored.
+
+        Parameters
+        ----------
+        data : pd.DataFrame
+            The statcast data.
+
+        Returns
+        -------
+        None
+        """
+        data = data[~data['game_pk'].isin(self.games)]
+        if data.empty:
+            return
+        self.games.update(data['game_pk'].unique())
+        counts = self.counts.add(count_zones(data, self.outcome), fill_value=0)
+        self.counts = counts.astype('int64').sort_index()
+
+    def zone_table(self, pitchers: list = None, pitch_type: str = None, count: str = None) -> pd.DataFrame:
+        """
+        Get the counts of a slice of the cube by zone and outcome.
+
+        Parameters
+        ----------
+        pitchers : list, optional
+            The ids of the pitchers, e.g. a single pitcher or a team's pitchers. The default is None, which means all.
+        pitch_type : str, optional
+            The pitch type. The default is None, which means all.
+        count : str, optional
+            The count, as 'balls-strikes' (e.g. '3-2'). The default is None, which means all.
+
+        Returns
+        -------
+        pd.DataFrame
+            The counts, with one row per zone cell (in the order of zone_labels) and one column per outcome.
+        """
+        counts = self.counts
+        if pitchers is not None:
+            pitchers = [pitcher for pitcher in pitchers if pitcher in counts.index.levels[0]]
+            counts = counts.loc[pitchers]
+        for level, value in [('pitch_type', pitch_type), ('count', count)]:
+            if value is not None:
+                counts = counts[counts.index.get_level_values(level) == value]
+        table = counts.groupby(level=['zone', 'outcome']).sum().unstack('outcome', fill_value=0)
+        return table.reindex(zone_labels, fill_value=0)
+
+    def zone_rate(self, outcomes: list, **filters) -> pd.Series:
+        """
+        Get the share of the pitches of each zone cell with some outcomes, e.g. the called strike rate.
+
+        Parameters
+        ----------
+        outcomes : list
+            The outcomes, e.g. ['called_strike'].
+        **filters
+            The pitchers, pitch_type and count of the slice, as in zone_table.
+
+        Returns
+        -------
+        pd.Series
+            The rate of every zone cell (NaN for cells without pitches).
+        """
+        table = self.zone_table(**filters)
+        total = table.sum(axis=1)
+        return table.reindex(columns=outcomes, fill_value=0).sum(axis=1) / total.where(total > 0)
+
+def zone_report(values: pd.Series, title_plot: str, outfolder: str, outfile: str, fmt: str = '{:.0%}') -> None:
+    """
+    Create a report of a value by zone cell, e.g. a rate from ZoneCube.zone_rate.
+
+    Parameters
+    ----------
+    values : pd.Series
+        The values, indexed by zone_labels.
+    title_plot : str
+        The title of the plot
+    outfolder : str
+        The name of the output folder
+    outfile : str
+        The name of the output file
+    fmt : str, optional
+        The format of the values. The default is '{:.0%}'.
+
+    Returns
+    -------
+    None
+    """
+    values = values.reindex(zone_labels)
+    fig, ax = plt.subplots(figsize=(9.6, 7.2))
+    grid = values.iloc[:9].to_numpy(dtype=float).reshape(3, 3)
+    ax.imshow(grid, cmap='Reds', extent=(zone_x[0], zone_x[-1], zone_z[0], zone_z[-1]), origin='upper')
+    for i in range(9):
+        x = (zone_x[i % 3] + zone_x[i % 3 + 1]) / 2
+        z = (zone_z[2 - i // 3] + zone_z[3 - i // 3]) / 2
+        ax.text(x, z, fmt.format(values.iloc[i]) if pd.notna(values.iloc[i]) else '-', horizontalalignment='center', verticalalignment='center')
+    # Extended strike zone, as in statcast.py
+    ax.add_patch(plt.Rectangle((zone_x[0]-shadow_margin, zone_z[0]-shadow_margin), (zone_x[-1]+shadow_margin)*2, zone_z[-1]-zone_z[0]+shadow_margin*2, fill=False, linestyle='--', color='grey'))
+    outside = '\n'.join(f"{label}: {fmt.format(values[label]) if pd.notna(values[label]) else '-'}" for label in zone_labels[9:])
+    ax.text(0.02, 0.98, outside, transform=ax.transAxes, verticalalignment='top')
+    ax.set_xlim(-3, 3)
+    ax.set_ylim(0, 5)
+    ax.set_title(title_plot)
+    if not os.path.exists(outfolder):
+        os.makedirs(outfolder)
+    save_figure(fig, os.path.join(outfolder, outfile))